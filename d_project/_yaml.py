@@ -0,0 +1,95 @@
+from pathlib import Path
+from typing import Any, Union
+import re
+
+try:
+    import yaml
+    from yaml import CSafeLoader, CSafeDumper
+except ImportError:
+    yaml = None
+
+
+# YAML 1.2 core schema patterns, as used by srsly's ruamel.yaml. PyYAML follows
+# YAML 1.1, where e.g. "on", "no" and "1:30" aren't strings.
+_YAML12_BOOL = re.compile(r"^(?:true|True|TRUE|false|False|FALSE)$")
+_YAML12_INT = re.compile(r"""^(?:[-+]?0b[0-1_]+
+    |[-+]?0o?[0-7_]+
+    |[-+]?[0-9_]+
+    |[-+]?0x[0-9a-fA-F_]+)$""", re.X)
+_YAML12_FLOAT = re.compile(r"""^(?:[-+]?(?:[0-9][0-9_]*)\.[0-9_]*(?:[eE][-+]?[0-9]+)?
+    |[-+]?(?:[0-9][0-9_]*)(?:[eE][-+]?[0-9]+)
+    |[-+]?\.[0-9_]+(?:[eE][-+][0-9]+)?
+    |[-+]?\.(?:inf|Inf|INF)
+    |\.(?:nan|NaN|NAN))$""", re.X)
+_YAML12_TAGS = ("tag:yaml.org,2002:bool", "tag:yaml.org,2002:int", "tag:yaml.org,2002:float")
+
+
+def _add_yaml12_resolvers(cls: Any) -> None:
+    """Register the YAML 1.2 bool, int and float resolvers on a loader or
+    dumper class.
+    cls: The PyYAML loader or dumper class.
+    """
+    cls.add_implicit_resolver("tag:yaml.org,2002:bool", _YAML12_BOOL, list("tTfF"))
+    cls.add_implicit_resolver("tag:yaml.org,2002:int", _YAML12_INT, list("-+0123456789"))
+    cls.add_implicit_resolver("tag:yaml.org,2002:float", _YAML12_FLOAT, list("-+0123456789."))
+
+
+def _construct_yaml12_int(loader: Any, node: Any) -> int:
+    """Construct an int the YAML 1.2 way: 0o is octal, leading zeros aren't."""
+    value = loader.construct_scalar(node).replace("_", "")
+    sign = -1 if value[0] == "-" else 1
+    if value[0] in "+-":
+        value = value[1:]
+    for prefix, base in (("0b", 2), ("0o", 8), ("0x", 16)):
+        if value.startswith(prefix):
+            return sign * int(value[2:], base)
+    return sign * int(value)
+
+
+if yaml is not None:
+    class _Loader(CSafeLoader):
+        """libyaml-based loader resolving plain scalars like YAML 1.2."""
+
+    # Replace the YAML 1.1 bool, int and float resolvers
+    _Loader.yaml_implicit_resolvers = {
+        first: [(tag, regexp) for tag, regexp in resolvers if tag not in _YAML12_TAGS]
+        for first, resolvers in CSafeLoader.yaml_implicit_resolvers.items()
+    }
+    _add_yaml12_resolvers(_Loader)
+    _Loader.add_constructor("tag:yaml.org,2002:int", _construct_yaml12_int)
+
+    class _Dumper(CSafeDumper):
+        """libyaml-based dumper quoting strings that YAML 1.1 or 1.2 would
+        read as another type."""
+
+    _add_yaml12_resolvers(_Dumper)
+
+
+def read_yaml(path: Union[str, Path]) -> Any:
+    """Load YAML from a file. Uses PyYAML's libyaml-based loader if available
+    and falls back to srsly otherwise. Both read plain scalars like YAML 1.2.
+    path (Union[str, Path]): The file path.
+    RETURNS (Any): The loaded content.
+    """
+    if yaml is None:
+        import srsly
+        return srsly.read_yaml(path)
+    with Path(path).open("r", encoding="utf8") as f:
+        try:
+            return yaml.load(f, Loader=_Loader)
+        except yaml.YAMLError as e:
+            raise ValueError(f"Invalid YAML: {e}")
+
+
+def write_yaml(path: Union[str, Path], data: Any) -> None:
+    """Write YAML to a file. Uses PyYAML's libyaml-based dumper if available
+    and falls back to srsly otherwise.
+    path (Union[str, Path]): The file path.
+    data (Any): The data to serialize. Key order is preserved.
+    """
+    if yaml is None:
+        import srsly
+        srsly.write_yaml(path, data)
+        return
+    with Path(path).open("w", encoding="utf8") as f:
+        yaml.dump(data, f, Dumper=_Dumper, sort_keys=False, allow_unicode=True, default_flow_style=False)
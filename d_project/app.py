@@ -1,7 +1,8 @@
-from typer import Typer, Context, Argument, Option
+from typer import Typer, Context, Argument, Option, BadParameter
 from pathlib import Path
-from .utils import parse_config_overrides, project_run, print_run_help, project_document
-import srsly
+from typing import Optional
+import os
+import sys
 
 
 
@@ -10,18 +11,34 @@ PROJECT_LOCK = "project.lock"
 app= Typer()
 
 
+def _check_project_dir(project_dir: Path) -> None:
+    """Make sure the project directory exists. Done in the command body rather
+    than by click, so --help doesn't touch the filesystem.
+    project_dir (Path): The project directory.
+    """
+    if not project_dir.exists():
+        raise BadParameter(f"Directory '{project_dir}' does not exist.", param_hint="'PROJECT_DIR'")
+    if not project_dir.is_dir():
+        raise BadParameter(f"Directory '{project_dir}' is a file.", param_hint="'PROJECT_DIR'")
+
+
 @app.command('run')
 def run(ctx: Context,
         subcommand: str = Argument(None, help=f"Name of command defined in the {PROJECT_FILE}"),
-        project_dir: Path = Argument(Path.cwd(), help="Location of project directory. Defaults to current working directory.", exists=True, file_okay=False),
+        project_dir: Optional[Path] = Argument(None, help="Location of project directory. Defaults to current working directory."),
         dry: bool = Option(False, "--dry", "-D", help="Perform a dry run and don't execute scripts"),
         show_help: bool = Option(False, "--help", help="Show help message and available subcommands"),
         force: bool = Option(False, "--force", "-F", help="Force re-running steps, even if nothing changed")):
     """Run a command or workflow defined in the project.yml file.
     """
+    if project_dir is None:
+        project_dir = Path.cwd()
     if show_help or not subcommand:
+        from .utils import print_run_help
         print_run_help(project_dir=project_dir, subcommand=subcommand)
     else:
+        _check_project_dir(project_dir)
+        from .utils import parse_config_overrides, project_run
         overrides = parse_config_overrides(ctx.args)
         project_run(project_dir, subcommand, overrides=overrides, force=force, dry=dry)
         
@@ -32,7 +49,7 @@ class AvailableLanguages(str, Enum):
     en = "en"
     
 @app.command('document')
-def project_document_cli(project_dir: Path = Argument(Path.cwd(), help="Path to cloned project. Defaults to current working directory.", exists=True, file_okay=False),
+def project_document_cli(project_dir: Optional[Path] = Argument(None, help="Path to cloned project. Defaults to current working directory."),
                          output_file: Path = Option("-", "--output", "-o", help="Path to output Markdown file for output. Defaults to - for standard output"),
                          no_emoji: bool = Option(False, "--no-emoji", "-NE", help="Don't use emoji"),
                          lang: AvailableLanguages = Option(AvailableLanguages.zh, "--lang", "-L", help="Language of the document")):
@@ -42,27 +59,76 @@ def project_document_cli(project_dir: Path = Argument(Path.cwd(), help="Path to
     auto-generated section and only the auto-generated docs will be replaced
     when you re-run the command.
     """
+    if project_dir is None:
+        project_dir = Path.cwd()
+    _check_project_dir(project_dir)
+    from .utils import project_document
     project_document(project_dir=project_dir, 
                      output_file=output_file, 
                      no_emoji=no_emoji,
                      lang=lang)
 
 
-BASE_CONTENT = {'title': 'demo',
-                'description': 'describe project details',
-                'vars': {'name': 'demo'},
-                'check_requirements': False,
-                'directories': [],
-                'workflows': {'all': ['command1', 'command2']},
-                'commands': [{'name': 'command1',
-                              'help': 'command1 help',
-                              'script': ['python **']}, 
-                             {'name': 'command2',
-                              'help': 'command2 help',
-                              'script': ['python **']}]}
+# Content of a freshly initialized project.yml, pre-serialized so init
+# doesn't need to run a YAML emitter
+BASE_CONTENT_YAML = b"""title: demo
+description: describe project details
+vars:
+  name: demo
+check_requirements: false
+directories: []
+workflows:
+  all:
+    - command1
+    - command2
+commands:
+  - name: command1
+    help: command1 help
+    script:
+      - python **
+  - name: command2
+    help: command2 help
+    script:
+      - python **
+"""
 
 @app.command('init')
 def init_project(path: str = Argument(default='./project.yml', help='初始化项目文件project.yml的路径')):
     """init project.yml
     """
-    srsly.write_yaml(path=path, data=BASE_CONTENT)
\ No newline at end of file
+    # Write to a temporary file and move it into place, so an interrupted
+    # init never leaves a truncated project.yml behind
+    tmp_path = f"{path}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        # Buffered writes keep going until all bytes are written
+        with os.fdopen(fd, "wb") as f:
+            f.write(BASE_CONTENT_YAML)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def main() -> None:
+    """Entry point of the project script. Answers --version straight from
+    argv, without building the Typer command tree.
+    """
+    if sys.argv[1:2] in (["-v"], ["--version"]):
+        from . import __version__
+        print(__version__)
+        return
+    app()
+
+
+def __getattr__(name: str):
+    # BASE_CONTENT is only built from the template when something asks for it
+    if name == "BASE_CONTENT":
+        import srsly
+        value = srsly.yaml_loads(BASE_CONTENT_YAML.decode("utf8"))
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
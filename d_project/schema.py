@@ -1,52 +1,114 @@
-from pydantic import BaseModel, ValidationError, StrictStr, Field
-from typing import Type, Dict, List, Any, Optional
-from collections import defaultdict
+from typing import TYPE_CHECKING, Callable, Type, Dict, List, Any, Optional, Tuple
+from functools import lru_cache
 
+if TYPE_CHECKING:
+    from pydantic import BaseModel
 
-def validate(schema: Type[BaseModel], obj: Dict[str, Any]) -> List[str]:
+
+__all__ = ["validate", "ProjectConfigSchema", "ProjectConfigCommand"]
+
+
+# Validation callables, keyed by schema class
+_VALIDATOR_CACHE: Dict[Any, Callable[[Any], Any]] = {}
+
+
+def _get_validator(schema: Type["BaseModel"]) -> Callable[[Any], Any]:
+    """Get the validation callable for a schema. Uses the compiled core
+    validator on pydantic v2 and falls back to parse_obj on v1.
+    schema (pydantic.BaseModel): The schema to validate against.
+    RETURNS (Callable[[Any], Any]): Function validating a single object.
+    """
+    validator = _VALIDATOR_CACHE.get(schema)
+    if validator is None:
+        core_validator = getattr(schema, "__pydantic_validator__", None)
+        if core_validator is not None:
+            validator = core_validator.validate_python
+        else:
+            validator = schema.parse_obj
+        _VALIDATOR_CACHE[schema] = validator
+    return validator
+
+
+@lru_cache(maxsize=256)
+def _fmt_loc(loc: Tuple[Any, ...]) -> str:
+    """Format the location of a validation error, e.g. commands -> 0 -> name.
+    loc (Tuple[Any, ...]): The error location.
+    RETURNS (str): The formatted location.
+    """
+    return " -> ".join(map(str, loc))
+
+
+def validate(schema: Type["BaseModel"], obj: Dict[str, Any]) -> List[str]:
     """Validate data against a given pydantic schema.
     obj (Dict[str, Any]): JSON-serializable data to validate.
     schema (pydantic.BaseModel): The schema to validate against.
     RETURNS (List[str]): A list of error messages, if available.
     """
+    from pydantic import ValidationError
+
+    validator = _get_validator(schema)
     try:
-        schema(**obj)
+        validator(obj)
         return []
     except ValidationError as e:
-        errors = e.errors()
-        data = defaultdict(list)
-        for error in errors:
-            err_loc = " -> ".join([str(p) for p in error.get("loc", [])])
-            data[err_loc].append(error.get("msg"))
-        return [f"[{loc}] {', '.join(msg)}" for loc, msg in data.items()] 
-    
-
-
-class ProjectConfigCommand(BaseModel):
-    # fmt: off
-    name: StrictStr = Field(..., title="Name of command")
-    help: Optional[StrictStr] = Field(None, title="Command description")
-    script: List[StrictStr] = Field([], title="List of CLI commands to run, in order")
-    deps: List[StrictStr] = Field([], title="File dependencies required by this command")
-    outputs: List[StrictStr] = Field([], title="Outputs produced by this command")
-    outputs_no_cache: List[StrictStr] = Field([], title="Outputs not tracked by DVC (DVC only)")
-    no_skip: bool = Field(False, title="Never skip this command, even if nothing changed")
-    # fmt: on
-
-    class Config:
-        title = "A single named command specified in a project config"
-        extra = "forbid"
-        
-    
-class ProjectConfigSchema(BaseModel):
-    # fmt: off
-    vars: Dict[StrictStr, Any] = Field({}, title="Optional variables to substitute in commands")
-    env: Dict[StrictStr, Any] = Field({}, title="Optional variable names to substitute in commands, mapped to environment variable names")
-    workflows: Dict[StrictStr, List[StrictStr]] = Field({}, title="Named workflows, mapped to list of project commands to run in order")
-    commands: List[ProjectConfigCommand] = Field([], title="Project command shortucts")
-    title: Optional[str] = Field(None, title="Project title")
-    description: Optional[str] = Field(None, title="Project description")
-    # fmt: on
-
-    class Config:
-        title = "Schema for project configuration file"
\ No newline at end of file
+        data: Dict[str, List[str]] = {}
+        for error in e.errors():
+            err_loc = _fmt_loc(tuple(error["loc"]))
+            msgs = data.get(err_loc)
+            if msgs is None:
+                data[err_loc] = [error["msg"]]
+            else:
+                msgs.append(error["msg"])
+        return [f"[{loc}] {', '.join(msg)}" for loc, msg in data.items()]
+
+
+@lru_cache(maxsize=None)
+def _schemas() -> Tuple[Type["BaseModel"], Type["BaseModel"]]:
+    """Build the pydantic models on first use, so importing this module
+    doesn't pull in pydantic.
+    RETURNS (Tuple[Type[BaseModel], Type[BaseModel]]): The command and project
+        config schemas.
+    """
+    from pydantic import BaseModel, StrictStr, Field
+
+    class ProjectConfigCommand(BaseModel):
+        # fmt: off
+        name: StrictStr = Field(..., title="Name of command")
+        help: Optional[StrictStr] = Field(None, title="Command description")
+        script: List[StrictStr] = Field([], title="List of CLI commands to run, in order")
+        deps: List[StrictStr] = Field([], title="File dependencies required by this command")
+        outputs: List[StrictStr] = Field([], title="Outputs produced by this command")
+        outputs_no_cache: List[StrictStr] = Field([], title="Outputs not tracked by DVC (DVC only)")
+        no_skip: bool = Field(False, title="Never skip this command, even if nothing changed")
+        aggregate: bool = Field(False, title="Run the Python scripts of this command in a single interpreter")
+        # fmt: on
+
+        class Config:
+            title = "A single named command specified in a project config"
+            extra = "forbid"
+
+    class ProjectConfigSchema(BaseModel):
+        # fmt: off
+        vars: Dict[StrictStr, Any] = Field({}, title="Optional variables to substitute in commands")
+        env: Dict[StrictStr, Any] = Field({}, title="Optional variable names to substitute in commands, mapped to environment variable names")
+        workflows: Dict[StrictStr, List[StrictStr]] = Field({}, title="Named workflows, mapped to list of project commands to run in order")
+        commands: List[ProjectConfigCommand] = Field([], title="Project command shortucts")
+        title: Optional[str] = Field(None, title="Project title")
+        description: Optional[str] = Field(None, title="Project description")
+        # fmt: on
+
+        class Config:
+            title = "Schema for project configuration file"
+
+    return ProjectConfigCommand, ProjectConfigSchema
+
+
+_LAZY_SCHEMAS = {"ProjectConfigCommand": 0, "ProjectConfigSchema": 1}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_SCHEMAS:
+        value = _schemas()[_LAZY_SCHEMAS[name]]
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,28 +1,77 @@
 from pathlib import Path
-from typing import Optional, Dict, Any, Union, List, Sequence, Tuple, Iterable, Iterator
-from rich.console import Console
+from typing import TYPE_CHECKING, Optional, Dict, Any, Union, List, Sequence, Set, Tuple, Iterable, Iterator, IO, Callable
 import srsly
-from .schema import ProjectConfigSchema, validate
+from ._yaml import read_yaml, write_yaml
 import sys
 from contextlib import contextmanager
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import copy
 from confection import ConfigValidationError, Config
 from configparser import InterpolationError
 from click import NoSuchOption
 from click.parser import split_arg_string
-from wasabi import msg
+from wasabi import msg, MarkdownRenderer
 import os
 import shlex
 import subprocess
-import pkg_resources
 import hashlib
-from rich import print
-from rich.table import Table
-
-
-console = Console(color_system='auto')
+import stat
+import struct
+try:
+    import orjson
+except ImportError:
+    orjson = None
+if TYPE_CHECKING:
+    from rich.console import Console
+# Checksums use BLAKE3 if installed, which is much faster on large files. In
+# the lockfile, checksums of algorithms other than md5 are prefixed with the
+# algorithm name, e.g. "blake3:..."
+_HASHERS: Dict[str, Callable[..., Any]] = {"md5": hashlib.md5}
+try:
+    from blake3 import blake3 as _blake3
+    _HASHERS["blake3"] = _blake3
+    _HASH_ALGO = "blake3"
+except ImportError:
+    _HASH_ALGO = "md5"
+_hasher = _HASHERS[_HASH_ALGO]
 
 PROJECT_FILE = "project.yml"
 PROJECT_LOCK = "project.lock"
+# JSON copy of the project.lock, which is faster to load than the YAML
+PROJECT_LOCK_JSON = "project.lock.json"
+# Parsed project.yml, cached next to it to skip re-parsing the YAML
+PROJECT_CACHE = ".project.yml.cache.msgpack"
+# Cache header: cache format version, project.yml st_mtime_ns and st_size
+_CACHE_HEADER = struct.Struct("<Hqq")
+# Bumped whenever the way project.yml is parsed changes
+_CACHE_VERSION = 2
+# Parsed project.yml files of this process: path -> ((mtime_ns, size), config)
+_YAML_CACHE: "OrderedDict[str, Tuple[Tuple[int, int], Dict[str, Any]]]" = OrderedDict()
+_YAML_CACHE_SIZE = 100
+# (path, stamp) keys of project.yml versions that passed validation
+_VALIDATED_CONFIGS: Set[Tuple[str, Tuple[int, int]]] = set()
+# Last interpolated config, together with the inputs it was built from
+_LAST_CONFIG: Optional[Tuple[Any, Dict[str, Any]]] = None
+# Read size when hashing files
+_HASH_CHUNK_SIZE = 1 << 20
+# Commands are split in POSIX mode everywhere except on Windows
+_SHLEX_POSIX = not sys.platform.startswith('win')
+# Installed distribution versions, cached together with the sys.path they were read from
+_INSTALLED_VERSIONS: Optional[Tuple[Tuple[str, ...], Dict[str, str]]] = None
+
+
+
+@lru_cache(maxsize=1)
+def _console() -> "Console":
+    """Create the rich console on first use, so rich is only imported when
+    tables or rules are actually printed.
+    RETURNS (Console): The shared console.
+    """
+    from rich.console import Console
+    return Console(color_system='auto')
+
 
 class ENV_VARS:
     CONFIG_OVERRIDES = "D_CONFIG_OVERRIDES"
@@ -91,6 +140,10 @@ class SimpleFrozenList(list):
         raise NotImplementedError()
     
 
+# Shared immutable defaults for function arguments
+_EMPTY_DICT = SimpleFrozenDict()
+_EMPTY_LIST = SimpleFrozenList()
+
 
 def validate_project_commands(config: Dict[str, Any]) -> None:
     """Check that project commands and workflows are valid, don't contain
@@ -99,17 +152,18 @@ def validate_project_commands(config: Dict[str, Any]) -> None:
     """
     command_names = [cmd["name"] for cmd in config.get("commands", [])]
     workflows = config.get("workflows", {})
-    duplicates = set([cmd for cmd in command_names if command_names.count(cmd) > 1])
+    duplicates = [name for name, count in Counter(command_names).items() if count > 1]
+    commands_set = set(command_names)
     if duplicates:
         err = f"Duplicate commands defined in {PROJECT_FILE}: {', '.join(duplicates)}"
-        console.print(err)
+        msg.fail(err)
     for workflow_name, workflow_steps in workflows.items():
         if workflow_name in command_names:
             err = f"Can't use workflow name '{workflow_name}': name already exists as a command"
-            console.print(err)
+            msg.fail(err)
         for step in workflow_steps:
-            if step not in command_names:
-                console.print(
+            if step not in commands_set:
+                msg.fail(
                     f"Unknown command specified in workflow '{workflow_name}': {step}",
                     f"Workflows can only refer to commands defined in the 'commands' "
                     f"section of the {PROJECT_FILE}.")
@@ -138,7 +192,7 @@ def show_validation_error(
             desc = f"{e.desc}" if not desc else f"{e.desc}\n\n{desc}"
         # Re-generate a new error object with overrides
         err = e.from_error(e, title="", desc=desc, show_config=show_config)
-        console.print(title)
+        msg.fail(title)
         print(err.text.strip())
         if hint_fill and "value_error.missing" in err.error_types:
             config_path = (
@@ -146,12 +200,12 @@ def show_validation_error(
                 if file_path is not None and str(file_path) != "-"
                 else "config.cfg"
             )
-            console.print(
+            msg.text(
                 "If your config contains missing values, you can run the 'init "
                 "fill-config' command to fill in all the defaults, if possible:")
         sys.exit(1)
     except InterpolationError as e:
-        console.print("Config validation error", e, exits=1)
+        msg.fail("Config validation error", e, exits=1)
         
 def _parse_overrides(args: List[str], is_cli: bool = False) -> Dict[str, Any]:
     result = {}
@@ -192,7 +246,7 @@ def _parse_override(value: Any) -> Any:
         
         
 def substitute_project_variables(config: Dict[str, Any],
-                                 overrides: Dict[str, Any] = SimpleFrozenDict(),
+                                 overrides: Dict[str, Any] = _EMPTY_DICT,
                                  key: str = "vars",
                                  env_key: str = "env") -> Dict[str, Any]:
     """Interpolate variables in the project file using the config system.
@@ -211,14 +265,68 @@ def substitute_project_variables(config: Dict[str, Any],
     # section "project" (otherwise, a list of commands in the top scope wouldn't)
     # be allowed by Thinc's config system
     cfg = Config({"project": config, key: config[key], env_key: config[env_key]})
-    cfg = Config().from_str(cfg.to_str(), overrides=overrides)
-    interpolated = cfg.interpolate()
+    # from_str already interpolates (again after applying overrides), so no
+    # extra interpolate() round-trip is needed
+    interpolated = Config().from_str(cfg.to_str(), overrides=overrides)
     return dict(interpolated["project"])
 
 
+def _read_project_yaml(config_path: Path) -> Tuple[Tuple[str, Tuple[int, int]], Dict[str, Any]]:
+    """Read the project.yml, reusing earlier parses of the same file content.
+    Parsed configs are kept in an in-process LRU cache and in a msgpack file
+    next to the project.yml. Both are keyed by the modification time and size
+    of the project.yml, and the msgpack cache is rewritten whenever the YAML
+    is parsed.
+    config_path (Path): The path to the project.yml.
+    RETURNS (Tuple[Tuple[str, Tuple[int, int]], Dict[str, Any]]): The resolved
+        path and stamp identifying this version of the file, and the parsed
+        project.yml. Callers get their own copy and can modify it.
+    """
+    st = config_path.stat()
+    stamp = (st.st_mtime_ns, st.st_size)
+    path_key = str(config_path.resolve())
+    cached = _YAML_CACHE.get(path_key)
+    if cached is not None and cached[0] == stamp:
+        _YAML_CACHE.move_to_end(path_key)
+        return (path_key, stamp), copy.deepcopy(cached[1])
+    config = _read_project_yaml_file(config_path, stamp)
+    _YAML_CACHE[path_key] = (stamp, config)
+    _YAML_CACHE.move_to_end(path_key)
+    if len(_YAML_CACHE) > _YAML_CACHE_SIZE:
+        _YAML_CACHE.popitem(last=False)
+    return (path_key, stamp), copy.deepcopy(config)
+
+
+def _read_project_yaml_file(config_path: Path, stamp: Tuple[int, int]) -> Dict[str, Any]:
+    """Read the project.yml from the msgpack cache next to it if its header
+    matches, or parse the YAML and rewrite the cache.
+    config_path (Path): The path to the project.yml.
+    stamp (Tuple[int, int]): Modification time (ns) and size of the file.
+    RETURNS (Dict[str, Any]): The parsed project.yml.
+    """
+    header = _CACHE_HEADER.pack(_CACHE_VERSION, *stamp)
+    cache_path = config_path.parent / PROJECT_CACHE
+    if cache_path.exists():
+        content = cache_path.read_bytes()
+        if content[:_CACHE_HEADER.size] == header:
+            try:
+                return srsly.msgpack_loads(content[_CACHE_HEADER.size:])
+            except ValueError:
+                pass
+    config = read_yaml(config_path)
+    try:
+        content = srsly.msgpack_dumps(config)
+        # Only cache configs that survive the msgpack round-trip unchanged
+        if srsly.msgpack_loads(content) == config:
+            cache_path.write_bytes(header + content)
+    except (TypeError, ValueError, OverflowError, OSError):
+        pass
+    return config
+
+
 def load_project_config(path: Path, 
                         interpolate: bool = True, 
-                        overrides: Dict[str, Any] = SimpleFrozenDict()) -> Dict[str, Any]:
+                        overrides: Dict[str, Any] = _EMPTY_DICT) -> Dict[str, Any]:
     """Load the project.yml file from a directory and validate it. Also make
     sure that all directories defined in the config exist.
     path (Path): The path to the project directory.
@@ -226,32 +334,65 @@ def load_project_config(path: Path,
     overrides (Dict[str, Any]): Optional config overrides.
     RETURNS (Dict[str, Any]): The loaded project.yml.
     """
+    global _LAST_CONFIG
     config_path = Path(path, PROJECT_FILE)
     if not config_path.exists():
-        console.print(f"Can't find {PROJECT_FILE}")
+        msg.fail(f"Can't find {PROJECT_FILE}", config_path, exits=1)
     invalid_err = f"Invalid {PROJECT_FILE}. Double-check that the YAML is correct."
+    # The pydantic models are only built once a config is actually validated
+    from .schema import ProjectConfigSchema, validate
     try:
-        config = srsly.read_yaml(config_path)
+        cache_key, config = _read_project_yaml(config_path)
     except ValueError as e:
-        console.print(invalid_err)
-    errors = validate(ProjectConfigSchema, config)
-    if errors:
-        console.print(invalid_err)
-        print("\n".join(errors))
-        sys.exit(1)
-    validate_project_commands(config)
+        msg.fail(invalid_err, e, exits=1)
+    # Validation only depends on the file content, so it's done once per version
+    if cache_key not in _VALIDATED_CONFIGS:
+        errors = validate(ProjectConfigSchema, config)
+        if errors:
+            msg.fail(invalid_err)
+            print("\n".join(errors))
+            sys.exit(1)
+        validate_project_commands(config)
+        _VALIDATED_CONFIGS.add(cache_key)
     # Make sure directories defined in config exist
     for subdir in config.get("directories", []):
         dir_path = path / subdir
         if not dir_path.exists():
             dir_path.mkdir(parents=True)
-    if interpolate:
-        err = f"{PROJECT_FILE} validation error"
-        with show_validation_error(title=err, hint_fill=False):
-            config = substitute_project_variables(config, overrides)
+    if not interpolate:
+        intern_config_strings(config)
+        return config
+    # Interpolation depends on the file, the overrides and the referenced env vars
+    env_values = tuple(os.environ.get(env_var, "") for env_var in config.get("env", {}).values())
+    last_key = (cache_key, repr(sorted(overrides.items())), env_values)
+    if _LAST_CONFIG is not None and _LAST_CONFIG[0] == last_key:
+        return copy.deepcopy(_LAST_CONFIG[1])
+    err = f"{PROJECT_FILE} validation error"
+    with show_validation_error(title=err, hint_fill=False):
+        config = substitute_project_variables(config, overrides)
+    intern_config_strings(config)
+    _LAST_CONFIG = (last_key, copy.deepcopy(config))
     return config
 
 
+def intern_config_strings(config: Dict[str, Any]) -> None:
+    """Intern the command and workflow strings of a loaded config in place.
+    Command names, scripts and paths tend to repeat across commands and
+    workflows, so this saves memory and speeds up the name lookups.
+    config (Dict[str, Any]): The loaded config.
+    """
+    for cmd in config.get("commands", []):
+        for key in ("name", "help"):
+            if isinstance(cmd.get(key), str):
+                cmd[key] = sys.intern(cmd[key])
+        for key in ("script", "deps", "outputs", "outputs_no_cache"):
+            if key in cmd:
+                cmd[key] = [sys.intern(v) if isinstance(v, str) else v for v in cmd[key]]
+    workflows = config.get("workflows", {})
+    for name, steps in workflows.items():
+        workflows[name] = [sys.intern(step) if isinstance(step, str) else step for step in steps]
+
+
 def is_cwd(path: Union[Path, str]) -> bool:
     """Check whether a path is the current working directory.
     path (Union[Path, str]): The directory path.
@@ -264,8 +405,13 @@ def split_command(command: str) -> List[str]:
     command (str) : The command to split
     RETURNS (List[str]): The split command.
     """
-    is_windows = sys.platform.startswith('win')
-    return shlex.split(command, posix=not is_windows)
+    return list(_split_cached(command))
+
+
+@lru_cache(maxsize=1024)
+def _split_cached(command: str) -> Tuple[str, ...]:
+    # Returns a tuple so the cached value can't be modified by callers
+    return tuple(shlex.split(command, posix=_SHLEX_POSIX))
 
 
 def join_command(command: List[str]) -> str:
@@ -302,7 +448,6 @@ def run_command(command: Union[str, List[str]],
     try:
         ret = subprocess.run(
             cmd_list,
-            env=os.environ.copy(),
             input=stdin,
             encoding="utf8",
             check=False,
@@ -337,6 +482,9 @@ def print_run_help(project_dir: Path, subcommand: Optional[str] = None) -> None:
         project_dir (Path): project.yml文件目录
         subcommand (Optional[str], optional): 子命令. Defaults to None.
     """
+    from rich.table import Table
+
+    console = _console()
     config = load_project_config(project_dir)
     config_commands = config.get("commands", [])
     commands = {cmd["name"]: cmd for cmd in config_commands}
@@ -385,18 +533,26 @@ def print_run_help(project_dir: Path, subcommand: Optional[str] = None) -> None:
             console.print(flow_table, justify='left')
             
             
-def get_lock_entry(project_dir: Path, command: Dict[str, Any]) -> Dict[str, Any]:
+def get_lock_entry(project_dir: Path,
+                   command: Dict[str, Any],
+                   previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """Get a lockfile entry for a given command. An entry includes the command,
     the script (command steps) and a list of dependencies and outputs with
     their paths and file hashes, if available. The format is based on the
     dvc.lock files, to keep things consistent.
     project_dir (Path): The current project directory.
     command (Dict[str, Any]): The command, as defined in the project.yml.
+    previous (Optional[Dict[str, Any]]): The command's current lockfile entry,
+        to reuse the checksums of files that didn't change since. Its checksum
+        algorithm is kept if it's available.
     RETURNS (Dict[str, Any]): The lockfile entry.
     """
-    deps = get_fileinfo(project_dir, command.get("deps", []))
-    outs = get_fileinfo(project_dir, command.get("outputs", []))
-    outs_nc = get_fileinfo(project_dir, command.get("outputs_no_cache", []))
+    prev_deps = previous.get("deps", []) if previous else []
+    prev_outs = previous.get("outs", []) if previous else []
+    algo = _entry_hash_algo(previous) if previous else _HASH_ALGO
+    deps = get_fileinfo(project_dir, command.get("deps", []), previous=prev_deps, algo=algo)
+    outs = get_fileinfo(project_dir, command.get("outputs", []), previous=prev_outs, algo=algo)
+    outs_nc = get_fileinfo(project_dir, command.get("outputs_no_cache", []), previous=prev_outs, algo=algo)
     return {
         "cmd": f"project run {command['name']}",
         "script": command["script"],
@@ -404,19 +560,81 @@ def get_lock_entry(project_dir: Path, command: Dict[str, Any]) -> Dict[str, Any]
         "outs": [*outs, *outs_nc]
     }
     
-def get_fileinfo(project_dir: Path, paths: List[str]) -> List[Dict[str, Optional[str]]]:
+def get_fileinfo(project_dir: Path,
+                 paths: List[str],
+                 previous: Iterable[Dict[str, Any]] = _EMPTY_LIST,
+                 algo: str = _HASH_ALGO) -> List[Dict[str, Any]]:
     """Generate the file information for a list of paths (dependencies, outputs).
-    Includes the file path and the file's checksum.
+    Includes the file path and the file's checksum. For regular files, the
+    modification time and size are recorded too, and a previous checksum is
+    reused if both are unchanged and it was made with the same algorithm.
+    Directories are always rehashed, since their own stats don't reflect
+    changes to the files inside.
     project_dir (Path): The current project directory.
     paths (List[str]): The file paths.
-    RETURNS (List[Dict[str, str]]): The lockfile entry for a file.
+    previous (Iterable[Dict[str, Any]]): File information from the lockfile.
+    algo (str): The checksum algorithm, e.g. "md5" or "blake3".
+    RETURNS (List[Dict[str, Any]]): The lockfile entry for a file.
     """
+    prev_info = {info["path"]: info for info in previous}
     data = []
     for path in paths:
         file_path = project_dir / path
-        md5 = get_checksum(file_path) if file_path.exists() else None
-        data.append({"path": path, "md5": md5})
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            data.append({"path": path, "hash": None})
+            continue
+        if stat.S_ISREG(st.st_mode):
+            prev = prev_info.get(path, {})
+            if (_hash_algo(prev.get("hash")) == algo and prev.get("mtime") == st.st_mtime_ns
+                    and prev.get("size") == st.st_size):
+                checksum = prev["hash"]
+            else:
+                checksum = get_checksum(file_path, st=st, algo=algo)
+            data.append({"path": path, "hash": checksum, "mtime": st.st_mtime_ns, "size": st.st_size})
+        else:
+            data.append({"path": path, "hash": get_checksum(file_path, st=st, algo=algo)})
     return data
+
+
+def _lock_entry_content(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Get the parts of a lockfile entry that decide whether a command is
+    rerun. File stats are left out: they only serve to skip rehashing, so
+    touching a file without changing it doesn't trigger a rerun. Checksums
+    stored under "md5" by older versions are read as "hash".
+    entry (Dict[str, Any]): The lockfile entry.
+    RETURNS (Dict[str, Any]): The entry with only path and checksum per file.
+    """
+    files = {key: [{"path": info["path"], "hash": info.get("hash", info.get("md5"))} for info in entry.get(key, [])]
+             for key in ("deps", "outs")}
+    return {**entry, **files}
+
+
+def _hash_algo(checksum: Optional[str]) -> Optional[str]:
+    """Get the algorithm of a lockfile checksum.
+    checksum (Optional[str]): The checksum, e.g. "blake3:..." or a bare md5.
+    RETURNS (Optional[str]): The algorithm name, or None if there's no checksum.
+    """
+    if not checksum:
+        return None
+    algo, sep, _ = checksum.partition(":")
+    return algo if sep else "md5"
+
+
+def _entry_hash_algo(entry: Dict[str, Any]) -> str:
+    """Get the checksum algorithm to use for a command. This is the one its
+    lockfile entry already uses, if it's available, so a lockfile shared
+    between environments with and without blake3 doesn't keep changing.
+    entry (Dict[str, Any]): The command's lockfile entry.
+    RETURNS (str): The algorithm name.
+    """
+    for key in ("deps", "outs"):
+        for info in entry.get(key, []):
+            algo = _hash_algo(info.get("hash", info.get("md5")))
+            if algo is not None:
+                return algo if algo in _HASHERS else _HASH_ALGO
+    return _HASH_ALGO
     
 def validate_subcommand(commands: Sequence[str], workflows: Sequence[str], subcommand: str) -> None:
     """Check that a subcommand is valid and defined. Raises an error otherwise.
@@ -447,49 +665,156 @@ def update_lockfile(project_dir: Path, command: Dict[str, Any]) -> None:
     command (Dict[str, Any]): The command, as defined in the project.yml.
     """
     lock_path = project_dir / PROJECT_LOCK
-    if not lock_path.exists():
-        srsly.write_yaml(lock_path, {})
-        data = {}
-    else:
-        data = srsly.read_yaml(lock_path)
-    data[command["name"]] = get_lock_entry(project_dir, command)
-    srsly.write_yaml(lock_path, data)
-    
-def get_checksum(path: Union[Path, str]) -> str:
+    data = read_lockfile(lock_path) if lock_path.exists() else {}
+    data[command["name"]] = get_lock_entry(project_dir, command, previous=data.get(command["name"]))
+    write_lockfile(lock_path, data)
+
+
+def read_lockfile(lock_path: Path) -> Dict[str, Any]:
+    """Read the project.lock. Uses its JSON copy if that was written after
+    the last change to the YAML, and refreshes the copy otherwise.
+    lock_path (Path): The path to the project.lock.
+    RETURNS (Dict[str, Any]): The lockfile entries, keyed by command name.
+    """
+    json_path = lock_path.with_name(PROJECT_LOCK_JSON)
+    if json_path.exists() and json_path.stat().st_mtime_ns >= lock_path.stat().st_mtime_ns:
+        try:
+            return srsly.read_json(json_path)
+        except ValueError:
+            pass
+    data = read_yaml(lock_path) or {}
+    try:
+        srsly.write_json(json_path, data)
+    except OSError:
+        pass
+    return data
+
+
+def write_lockfile(lock_path: Path, data: Dict[str, Any]) -> None:
+    """Write the project.lock and its JSON copy.
+    lock_path (Path): The path to the project.lock.
+    data (Dict[str, Any]): The lockfile entries, keyed by command name.
+    """
+    write_yaml(lock_path, data)
+    # Written second, so its mtime marks it as up to date with the YAML
+    srsly.write_json(lock_path.with_name(PROJECT_LOCK_JSON), data)
+
+
+def get_checksum(path: Union[Path, str], st: Optional[os.stat_result] = None, algo: str = _HASH_ALGO) -> str:
     """Get the checksum for a file or directory given its file path. If a
     directory path is provided, this uses all files in that directory.
     path (Union[Path, str]): The file or directory path.
-    RETURNS (str): The checksum.
+    st (Optional[os.stat_result]): The result of os.stat for the path, if the
+        caller already has it.
+    algo (str): The checksum algorithm, e.g. "md5" or "blake3".
+    RETURNS (str): The checksum, prefixed with the algorithm unless it's md5.
     """
+    hasher = _HASHERS[algo]
     path = Path(path)
-    if not (path.is_file() or path.is_dir()):
+    if st is None:
+        try:
+            st = path.stat()
+        except OSError:
+            pass
+    if st is None or not (stat.S_ISREG(st.st_mode) or stat.S_ISDIR(st.st_mode)):
         msg.fail(f"Can't get checksum for {path}: not a file or directory", exits=1)
-    if path.is_file():
-        return hashlib.md5(Path(path).read_bytes()).hexdigest()
+    if stat.S_ISREG(st.st_mode):
+        digest = _file_hash(path, hasher)
     else:
-        # TODO: this is currently pretty slow
-        dir_checksum = hashlib.md5()
-        for sub_file in sorted(fp for fp in path.rglob("*") if fp.is_file()):
-            dir_checksum.update(sub_file.read_bytes())
-        return dir_checksum.hexdigest()
+        # Files are hashed in parallel and their digests combined in sorted
+        # order, so the result doesn't depend on which thread finishes first
+        files = sorted(fp for fp in path.rglob("*") if fp.is_file())
+        dir_checksum = hasher()
+        if files:
+            with ThreadPoolExecutor(max_workers=min(32, len(files))) as executor:
+                for file_digest in executor.map(_file_hash, files, [hasher] * len(files)):
+                    dir_checksum.update(file_digest.encode("utf8"))
+        digest = dir_checksum.hexdigest()
+    return digest if algo == "md5" else f"{algo}:{digest}"
+
+
+def _update_hash(hasher: Any, path: Path) -> None:
+    """Feed the content of a file into a hash object in fixed-size chunks, so
+    large files are never read into memory at once.
+    hasher (Any): The hashlib hash object to update.
+    path (Path): The file path.
+    """
+    buf = bytearray(_HASH_CHUNK_SIZE)
+    view = memoryview(buf)
+    with path.open("rb", buffering=0) as f:
+        size = f.readinto(buf)
+        while size:
+            hasher.update(view[:size])
+            size = f.readinto(buf)
+
+
+def _file_hash(path: Path, hasher: Callable[..., Any] = _hasher) -> str:
+    """Get the checksum of a single file, reading it in chunks.
+    path (Path): The file path.
+    hasher (Callable[..., Any]): Constructor of the hash object.
+    RETURNS (str): The hex digest.
+    """
+    if hasattr(hashlib, "file_digest"):  # Python 3.11+
+        with path.open("rb") as f:
+            return hashlib.file_digest(f, hasher).hexdigest()
+    hash_obj = hasher()
+    _update_hash(hash_obj, path)
+    return hash_obj.hexdigest()
     
+def _installed_versions() -> Dict[str, str]:
+    """Get the versions of all installed distributions. The result is cached
+    and only recomputed when sys.path changes.
+    RETURNS (Dict[str, str]): The versions, keyed by canonical package name.
+    """
+    try:
+        from importlib.metadata import distributions
+    except ImportError:  # Python 3.7
+        from importlib_metadata import distributions
+    from packaging.utils import canonicalize_name
+
+    global _INSTALLED_VERSIONS
+    key = tuple(sys.path)
+    if _INSTALLED_VERSIONS is None or _INSTALLED_VERSIONS[0] != key:
+        versions = {}
+        for dist in distributions():
+            name = dist.metadata["Name"]
+            if name:
+                versions.setdefault(canonicalize_name(name), dist.version)
+        _INSTALLED_VERSIONS = (key, versions)
+    return _INSTALLED_VERSIONS[1]
+
+
 def _check_requirements(requirements: List[str]) -> Tuple[bool, bool]:
     """Checks whether requirements are installed and free of version conflicts.
     requirements (List[str]): List of requirements.
     RETURNS (Tuple[bool, bool]): Whether (1) any packages couldn't be imported, (2) any packages with version conflicts
         exist.
     """
+    # Only needed if the project has a requirements.txt, so not imported with the module
+    from packaging.requirements import Requirement, InvalidRequirement
+    from packaging.utils import canonicalize_name
 
     failed_pkgs_msgs: List[str] = []
     conflicting_pkgs_msgs: List[str] = []
 
+    versions = _installed_versions()
     for req in requirements:
+        req = req.strip()
+        # Skip comments, pip options like -r and anything that isn't a plain
+        # requirement specifier (e.g. URLs)
+        if not req or req.startswith(("#", "-")):
+            continue
         try:
-            pkg_resources.require(req)
-        except pkg_resources.DistributionNotFound as dnf:
-            failed_pkgs_msgs.append(dnf.report())
-        except pkg_resources.VersionConflict as vc:
-            conflicting_pkgs_msgs.append(vc.report())
+            requirement = Requirement(req)
+        except InvalidRequirement:
+            continue
+        if requirement.marker is not None and not requirement.marker.evaluate():
+            continue
+        version = versions.get(canonicalize_name(requirement.name))
+        if version is None:
+            failed_pkgs_msgs.append(f"The '{req}' distribution was not found and is required by the application")
+        elif not requirement.specifier.contains(version, prereleases=True):
+            conflicting_pkgs_msgs.append(f"{requirement.name} {version} is installed but {req} is required")
 
     if len(failed_pkgs_msgs) or len(conflicting_pkgs_msgs):
         msg.warn(
@@ -510,8 +835,15 @@ def get_hash(data, exclude: Iterable[str] = tuple()) -> str:
     """
     if isinstance(data, dict):
         data = {k: v for k, v in data.items() if k not in exclude}
-    data_str = srsly.json_dumps(data, sort_keys=True).encode("utf8")
-    return hashlib.md5(data_str).hexdigest()
+    data_bytes = None
+    if orjson is not None:
+        try:
+            data_bytes = orjson.dumps(data, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+        except TypeError:  # Types only srsly can serialize
+            pass
+    if data_bytes is None:
+        data_bytes = srsly.json_dumps(data, sort_keys=True).encode("utf8")
+    return _hasher(data_bytes).hexdigest()
 
 
 def check_rerun(project_dir: Path, command: Dict[str, Any]) -> bool:
@@ -528,25 +860,89 @@ def check_rerun(project_dir: Path, command: Dict[str, Any]) -> bool:
     lock_path = project_dir / PROJECT_LOCK
     if not lock_path.exists():  # We don't have a lockfile, run command
         return True
-    data = srsly.read_yaml(lock_path)
+    data = read_lockfile(lock_path)
     if command["name"] not in data:  # We don't have info about this command
         return True
     entry = data[command["name"]]
     # Always run commands with no outputs (otherwise they'd always be skipped)
     if not entry.get("outs", []):
         return True
+    # Nothing to rehash if all files still have the recorded stats
+    if _entry_stats_unchanged(project_dir, command, entry):
+        return False
     # Always rerun if spaCy version or commit hash changed
     # If the entry in the lockfile matches the lockfile entry that would be
     # generated from the current command, we don't rerun because it means that
     # all inputs/outputs, hashes and scripts are the same and nothing changed
-    lock_entry = get_lock_entry(project_dir, command)
-    return get_hash(lock_entry) != get_hash(entry)
+    lock_entry = get_lock_entry(project_dir, command, previous=entry)
+    return get_hash(_lock_entry_content(lock_entry)) != get_hash(_lock_entry_content(entry))
+
+
+def _entry_stats_unchanged(project_dir: Path, command: Dict[str, Any], entry: Dict[str, Any]) -> bool:
+    """Check whether a lockfile entry is still up to date without hashing
+    anything: the script is the same and every dependency and output is a
+    regular file whose modification time and size match the recorded ones.
+    project_dir (Path): The current project directory.
+    command (Dict[str, Any]): The command, as defined in the project.yml.
+    entry (Dict[str, Any]): The command's lockfile entry.
+    RETURNS (bool): Whether the entry is known to be unchanged. False means
+        the checksums need to be compared.
+    """
+    if entry.keys() != {"cmd", "script", "deps", "outs"}:
+        return False
+    if entry["cmd"] != f"project run {command['name']}" or entry["script"] != command["script"]:
+        return False
+    outputs = [*command.get("outputs", []), *command.get("outputs_no_cache", [])]
+    for paths, infos in ((command.get("deps", []), entry["deps"]), (outputs, entry["outs"])):
+        if len(paths) != len(infos):
+            return False
+        for path, info in zip(paths, infos):
+            if info.get("path") != path or not info.get("hash") or "mtime" not in info:
+                return False
+            try:
+                st = os.stat(project_dir / path)
+            except OSError:
+                return False
+            if not stat.S_ISREG(st.st_mode) or st.st_mtime_ns != info["mtime"] or st.st_size != info.get("size"):
+                return False
+    return True
+
+
+# Runs several Python scripts, in order, inside one interpreter. The argv of
+# each script is passed as a JSON list in sys.argv[1].
+AGGREGATE_DRIVER = """import json, os, runpy, sys
+for argv in json.loads(sys.argv[1]):
+    sys.argv = argv
+    sys.path[0] = os.path.dirname(os.path.abspath(argv[0]))
+    try:
+        runpy.run_path(argv[0], run_name="__main__")
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            raise
+"""
+
+
+def _python_script_argvs(commands: Iterable[str]) -> Optional[List[List[str]]]:
+    """Get the script argvs of commands that all have the form
+    "python script.py [args]", so they can share one interpreter.
+    commands (Iterable[str]): The string commands.
+    RETURNS (Optional[List[List[str]]]): The argv of each script, or None if
+        any command isn't a plain Python script invocation.
+    """
+    argvs = []
+    for c in commands:
+        command = split_command(c)
+        if len(command) < 2 or command[0] not in ("python", "python3") or not command[1].endswith(".py"):
+            return None
+        argvs.append(command[1:])
+    return argvs
 
 
-def run_commands(commands: Iterable[str] = SimpleFrozenList(),
+def run_commands(commands: Iterable[str] = _EMPTY_LIST,
                  silent: bool = False,
                  dry: bool = False,
-                 capture: bool = False) -> None:
+                 capture: bool = False,
+                 aggregate: bool = False) -> None:
     """Run a sequence of commands in a subprocess, in order.
     commands (List[str]): The string commands.
     silent (bool): Don't print the commands.
@@ -556,7 +952,20 @@ def run_commands(commands: Iterable[str] = SimpleFrozenList(),
         sys.exit will be called with the return code. You should use capture=False
         when you want to turn over execution to the command, and capture=True
         when you want to run the command more like a function.
+    aggregate (bool): Run the commands in a single Python process if they are
+        all "python script.py" invocations, to only pay interpreter startup once.
     """
+    if aggregate:
+        # Read twice if the commands can't be aggregated
+        commands = list(commands)
+    argvs = _python_script_argvs(commands) if aggregate else None
+    if argvs is not None:
+        if not silent:
+            for argv in argvs:
+                msg.info(title=f"Running script: {join_command(argv)}")
+        if not dry:
+            run_command([sys.executable, "-c", AGGREGATE_DRIVER, srsly.json_dumps(argvs)], capture=capture)
+        return
     for c in commands:
         command = split_command(c)
         # Not sure if this is needed or a good idea. Motivation: users may often
@@ -595,7 +1004,7 @@ def working_dir(path: Union[str, Path]) -> Iterator[Path]:
 def project_run(project_dir: Path,
                 subcommand: str,
                 *,
-                overrides: Dict[str, Any] = SimpleFrozenDict(),
+                overrides: Dict[str, Any] = _EMPTY_DICT,
                 force: bool = False,
                 dry: bool = False,
                 capture: bool = False) -> None:
@@ -615,22 +1024,56 @@ def project_run(project_dir: Path,
         when you want to run the command more like a function.
     """
     config = load_project_config(project_dir, overrides=overrides)
-    commands = {cmd["name"]: cmd for cmd in config.get("commands", [])}
-    workflows = config.get("workflows", {})
+    commands, workflows = _prepare_commands(config)
     validate_subcommand(list(commands.keys()), list(workflows.keys()), subcommand)
 
     req_path = project_dir / "requirements.txt"
     if config.get("check_requirements", True) and os.path.exists(req_path):
-        with req_path.open() as requirements_file:
-            _check_requirements([req.replace("\n", "") for req in requirements_file])
+        _check_requirements(req_path.read_text(encoding="utf8").splitlines())
+
+    _project_run(project_dir, subcommand, commands=commands, workflows=workflows, force=force, dry=dry, capture=capture)
 
+
+def _prepare_commands(config: Dict[str, Any]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, List[str]]]:
+    """Get the commands and workflows of a loaded project config.
+    config (Dict[str, Any]): The loaded project config.
+    RETURNS (Tuple[Dict[str, Dict[str, Any]], Dict[str, List[str]]]): The
+        commands keyed by name and the workflows.
+    """
+    commands = {cmd["name"]: cmd for cmd in config.get("commands", [])}
+    workflows = config.get("workflows", {})
+    return commands, workflows
+
+
+def _project_run(project_dir: Path,
+                 subcommand: str,
+                 *,
+                 commands: Dict[str, Dict[str, Any]],
+                 workflows: Dict[str, List[str]],
+                 force: bool = False,
+                 dry: bool = False,
+                 capture: bool = False) -> None:
+    """Run a named script or workflow of an already loaded and validated
+    project config. Workflow steps reuse the same commands and workflows, so
+    the project.yml is only loaded once per project_run.
+    project_dir (Path): Path to project directory.
+    subcommand (str): Name of command to run.
+    commands (Dict[str, Dict[str, Any]]): The project commands, keyed by name.
+    workflows (Dict[str, List[str]]): The project workflows.
+    force (bool): Force re-running, even if nothing changed.
+    dry (bool): Perform a dry run and don't execute commands.
+    capture (bool): Whether to capture the output and errors of individual commands.
+    """
     if subcommand in workflows:
         msg.info(f"Running workflow '{subcommand}'")
         for cmd in workflows[subcommand]:
-            project_run(
+            if cmd not in commands and cmd not in workflows:
+                validate_subcommand(list(commands.keys()), list(workflows.keys()), cmd)
+            _project_run(
                 project_dir,
                 cmd,
-                overrides=overrides,
+                commands=commands,
+                workflows=workflows,
                 force=force,
                 dry=dry,
                 capture=capture,
@@ -644,12 +1087,12 @@ def project_run(project_dir: Path,
                 err_kwargs = {"exits": 1} if not dry else {}
                 msg.fail(err, err_help, **err_kwargs)
         with working_dir(project_dir) as current_dir:
-            console.rule(title=subcommand)
+            _console().rule(title=subcommand)
             rerun = check_rerun(current_dir, cmd)
             if not rerun and not force:
                 msg.info(f"Skipping '{cmd['name']}': nothing changed")
             else:
-                run_commands(cmd["script"], dry=dry, capture=capture)
+                run_commands(cmd["script"], dry=dry, capture=capture, aggregate=cmd.get("aggregate", False))
                 if not dry:
                     update_lockfile(current_dir, cmd)
                     
@@ -667,57 +1110,12 @@ def parse_config_overrides(args: List[str],
     cli_overrides = _parse_overrides(args, is_cli=True)
     if cli_overrides:
         keys = [k for k in cli_overrides if k not in env_overrides]
-        console.log(f"Config overrides from CLI: {keys}")
+        _console().log(f"Config overrides from CLI: {keys}")
     if env_overrides:
-        console.log(f"Config overrides from env variables: {list(env_overrides)}")
+        _console().log(f"Config overrides from env variables: {list(env_overrides)}")
     return {**cli_overrides, **env_overrides}
 
 
-def _parse_overrides(args: List[str], is_cli: bool = False) -> Dict[str, Any]:
-    result = {}
-    while args:
-        opt = args.pop(0)
-        err = f"Invalid config override '{opt}'"
-        if opt.startswith("--"):  # new argument
-            orig_opt = opt
-            opt = opt.replace("--", "")
-            if "." not in opt:
-                if is_cli:
-                    raise NoSuchOption(orig_opt)
-                else:
-                    msg.fail(f"{err}: can't override top-level sections", exits=1)
-            if "=" in opt:  # we have --opt=value
-                opt, value = opt.split("=", 1)
-                opt = opt.replace("-", "_")
-            else:
-                if not args or args[0].startswith("--"):  # flag with no value
-                    value = "true"
-                else:
-                    value = args.pop(0)
-            result[opt] = _parse_override(value)
-        else:
-            msg.fail(f"{err}: name should start with --", exits=1)
-    return result
-
-
-def _parse_override(value: Any) -> Any:
-    # Just like we do in the config, we're calling json.loads on the
-    # values. But since they come from the CLI, it'd be unintuitive to
-    # explicitly mark strings with escaped quotes. So we're working
-    # around that here by falling back to a string if parsing fails.
-    # TODO: improve logic to handle simple types like list of strings?
-    try:
-        return srsly.json_loads(value)
-    except ValueError:
-        return str(value)
-    
-    
-    
-from pathlib import Path
-from wasabi import msg, MarkdownRenderer
-
-
-
 INTRO_PROJECT = f"""The [`{PROJECT_FILE}`]({PROJECT_FILE}) defines the data assets required by the
 project, as well as the available commands and workflows. """
 INTRO_COMMANDS = f"""The following commands are defined by the project. They
@@ -732,6 +1130,7 @@ be fetched by running `project assets` in the project directory."""
 # place if it already exists. Only the auto-generated part will be replaced.
 MARKER_START = "<!-- PROJECT: AUTO-GENERATED DOCS START (do not remove) -->"
 MARKER_END = "<!-- PROJECT: AUTO-GENERATED DOCS END (do not remove) -->"
+_LEN_END = len(MARKER_END)
 # If this marker is used in an existing README, it's ignored and not replaced
 MARKER_IGNORE = "<!-- PROJECT: IGNORE -->"
 
@@ -749,6 +1148,37 @@ class AvailableLanguages(str, Enum):
 
 
 
+# Section titles, intros and table headers of the generated docs per language
+_LANG = {
+    "en": {
+        "project_title": "Project",
+        "project_intro": INTRO_PROJECT,
+        "commands_title": "Commands",
+        "commands_intro": INTRO_COMMANDS,
+        "commands_header": ["Command", "Description"],
+        "workflows_title": "Workflows",
+        "workflows_intro": INTRO_WORKFLOWS,
+        "workflows_header": ["Workflow", "Steps"],
+        "assets_title": "Assets",
+        "assets_intro": INTRO_ASSETS,
+        "assets_header": ["File", "Source", "Description"],
+    },
+    "zh": {
+        "project_title": "项目",
+        "project_intro": INTRO_PROJECT_ZH,
+        "commands_title": "命令",
+        "commands_intro": INTRO_COMMANDS_ZH,
+        "commands_header": ["命令", "描述"],
+        "workflows_title": "流程",
+        "workflows_intro": INTRO_WORKFLOWS_ZH,
+        "workflows_header": ["流程", "步骤"],
+        "assets_title": "Assets",
+        "assets_intro": INTRO_ASSETS_ZH,
+        "assets_header": ["File", "Source", "Description"],
+    },
+}
+
+
 def project_document(project_dir: Path,
                      output_file: Path, 
                      *, 
@@ -756,129 +1186,210 @@ def project_document(project_dir: Path,
                      lang: AvailableLanguages = AvailableLanguages.zh) -> None:
     is_stdout = str(output_file) == "-"
     config = load_project_config(project_dir)
-    if lang == AvailableLanguages.en:
-        md = MarkdownRenderer(no_emoji=no_emoji)
-        md.add(MARKER_START)
-        title = config.get("title")
-        description = config.get("description")
-        md.add(md.title(1, f"Project{f': {title}' if title else ''}", "🪐"))
-        if description:
-            md.add(description)
-        md.add(md.title(2, PROJECT_FILE, "📋"))
-        md.add(INTRO_PROJECT)
-        # Commands
-        cmds = config.get("commands", [])
-        data = [(md.code(cmd["name"]), cmd.get("help", "")) for cmd in cmds]
-        if data:
-            md.add(md.title(3, "Commands", "⏯"))
-            md.add(INTRO_COMMANDS)
-            md.add(md.table(data, ["Command", "Description"]))
-        # Workflows
-        wfs = config.get("workflows", {}).items()
-        data = [(md.code(n), " &rarr; ".join(md.code(w) for w in stp)) for n, stp in wfs]
-        if data:
-            md.add(md.title(3, "Workflows", "⏭"))
-            md.add(INTRO_WORKFLOWS)
-            md.add(md.table(data, ["Workflow", "Steps"]))
-        # Assets
-        assets = config.get("assets", [])
-        data = []
-        for a in assets:
-            source = "Git" if a.get("git") else "URL" if a.get("url") else "Local"
-            dest_path = a["dest"]
-            dest = md.code(dest_path)
-            if source == "Local":
-                # Only link assets if they're in the repo
-                with working_dir(project_dir) as p:
-                    if (p / dest_path).exists():
-                        dest = md.link(dest, dest_path)
-            data.append((dest, source, a.get("description", "")))
-        if data:
-            md.add(md.title(3, "Assets", "🗂"))
-            md.add(INTRO_ASSETS)
-            md.add(md.table(data, ["File", "Source", "Description"]))
-        md.add(MARKER_END)
-        # Output result
-        if is_stdout:
-            print(md.text)
-        else:
-            content = md.text
-            if output_file.exists():
-                with output_file.open("r", encoding="utf8") as f:
-                    existing = f.read()
-                if MARKER_IGNORE in existing:
-                    msg.warn("Found ignore marker in existing file: skipping", output_file)
-                    return
-                if MARKER_START in existing and MARKER_END in existing:
-                    msg.info("Found existing file: only replacing auto-generated docs")
-                    before = existing.split(MARKER_START)[0]
-                    after = existing.split(MARKER_END)[1]
-                    content = f"{before}{content}{after}"
-                else:
-                    msg.warn("Replacing existing file")
-            with output_file.open("w", encoding="utf8") as f:
-                f.write(content)
-            msg.good("Saved project documentation", output_file)
-    elif lang == AvailableLanguages.zh:
-        md = MarkdownRenderer(no_emoji=no_emoji)
-        md.add(MARKER_START)
-        title = config.get("title")
-        description = config.get("description")
-        md.add(md.title(1, f"项目{f': {title}' if title else ''}", "🪐"))
-        if description:
-            md.add(description)
-        md.add(md.title(2, PROJECT_FILE, "📋"))
-        md.add(INTRO_PROJECT_ZH)
-        # Commands
-        cmds = config.get("commands", [])
-        data = [(md.code(cmd["name"]), cmd.get("help", "")) for cmd in cmds]
-        if data:
-            md.add(md.title(3, "命令", "⏯"))
-            md.add(INTRO_COMMANDS_ZH)
-            md.add(md.table(data, ["命令", "描述"]))
-        # Workflows
-        wfs = config.get("workflows", {}).items()
-        data = [(md.code(n), " &rarr; ".join(md.code(w) for w in stp)) for n, stp in wfs]
-        if data:
-            md.add(md.title(3, "流程", "⏭"))
-            md.add(INTRO_WORKFLOWS_ZH)
-            md.add(md.table(data, ["流程", "步骤"]))
-        # Assets
-        assets = config.get("assets", [])
-        data = []
-        for a in assets:
-            source = "Git" if a.get("git") else "URL" if a.get("url") else "Local"
-            dest_path = a["dest"]
-            dest = md.code(dest_path)
-            if source == "Local":
-                # Only link assets if they're in the repo
-                with working_dir(project_dir) as p:
-                    if (p / dest_path).exists():
-                        dest = md.link(dest, dest_path)
-            data.append((dest, source, a.get("description", "")))
-        if data:
-            md.add(md.title(3, "Assets", "🗂"))
-            md.add(INTRO_ASSETS_ZH)
-            md.add(md.table(data, ["File", "Source", "Description"]))
-        md.add(MARKER_END)
-        # Output result
-        if is_stdout:
-            print(md.text)
+    if not any(config.get(key) for key in ("title", "description", "commands", "workflows", "assets")):
+        msg.warn(f"Nothing to document in {PROJECT_FILE}",
+                 "It has no title, description, commands, workflows or assets.")
+        return
+    strings = _doc_strings(lang.value if isinstance(lang, Enum) else lang, no_emoji)
+    md = MarkdownRenderer(no_emoji=no_emoji)
+    # The renderer is only used for formatting, the sections are collected here
+    sections = [MARKER_START]
+    # Workflows usually refer to the same command names several times
+    codes: Dict[str, str] = {}
+    _emit_header(sections, md, strings, config)
+    _emit_commands(sections, md, strings, config.get("commands", []), codes)
+    _emit_workflows(sections, md, strings, config.get("workflows") or {}, codes)
+    _emit_assets(sections, md, strings, config.get("assets", []), project_dir)
+    sections.append(MARKER_END)
+    _write_or_print(output_file, sections, is_stdout)
+
+
+@lru_cache(maxsize=None)
+def _doc_strings(lang: str, no_emoji: bool) -> Dict[str, Any]:
+    """Get the strings of a language for the generated docs, together with
+    its section headings, which only depend on the language and emoji setting.
+    lang (str): The language, e.g. "zh".
+    no_emoji (bool): Whether the headings leave out the emoji.
+    RETURNS (Dict[str, Any]): The strings. Shared between calls, don't modify.
+    """
+    md = MarkdownRenderer(no_emoji=no_emoji)
+    strings = _LANG[lang]
+    return {
+        **strings,
+        "project_file_heading": md.title(2, PROJECT_FILE, "📋"),
+        "commands_heading": md.title(3, strings["commands_title"], "⏯"),
+        "workflows_heading": md.title(3, strings["workflows_title"], "⏭"),
+        "assets_heading": md.title(3, strings["assets_title"], "🗂"),
+    }
+
+
+def _code(md: MarkdownRenderer, codes: Dict[str, str], text: str) -> str:
+    """Format text as Markdown code, reusing earlier results.
+    md (MarkdownRenderer): The renderer.
+    codes (Dict[str, str]): Formatted texts, updated in place.
+    text (str): The text to format.
+    RETURNS (str): The formatted text.
+    """
+    formatted = codes.get(text)
+    if formatted is None:
+        formatted = codes[text] = md.code(text)
+    return formatted
+
+
+def _emit_header(sections: List[str], md: MarkdownRenderer, strings: Dict[str, Any], config: Dict[str, Any]) -> None:
+    """Add the project title, description and project.yml intro.
+    sections (List[str]): The document sections, extended in place.
+    md (MarkdownRenderer): The renderer.
+    strings (Dict[str, Any]): The strings of the output language.
+    config (Dict[str, Any]): The project config.
+    """
+    title = config.get("title")
+    description = config.get("description")
+    project_title = strings["project_title"] + ": " + title if title else strings["project_title"]
+    sections.append(md.title(1, project_title, "🪐"))
+    if description:
+        sections.append(description)
+    sections.extend((strings["project_file_heading"], strings["project_intro"]))
+
+
+def _emit_commands(sections: List[str],
+                   md: MarkdownRenderer,
+                   strings: Dict[str, Any],
+                   cmds: List[Dict[str, Any]],
+                   codes: Dict[str, str]) -> None:
+    """Add the commands table, if there are any commands.
+    sections (List[str]): The document sections, extended in place.
+    md (MarkdownRenderer): The renderer.
+    strings (Dict[str, Any]): The strings of the output language.
+    cmds (List[Dict[str, Any]]): The project commands.
+    codes (Dict[str, str]): Formatted command names, shared with the workflows.
+    """
+    data = [(_code(md, codes, cmd["name"]), cmd.get("help", "")) for cmd in cmds]
+    if data:
+        sections.extend((strings["commands_heading"],
+                         strings["commands_intro"],
+                         md.table(data, strings["commands_header"])))
+
+
+def _emit_workflows(sections: List[str],
+                    md: MarkdownRenderer,
+                    strings: Dict[str, Any],
+                    wfs: Dict[str, List[str]],
+                    codes: Dict[str, str]) -> None:
+    """Add the workflows table, if there are any workflows.
+    sections (List[str]): The document sections, extended in place.
+    md (MarkdownRenderer): The renderer.
+    strings (Dict[str, Any]): The strings of the output language.
+    wfs (Dict[str, List[str]]): The project workflows.
+    codes (Dict[str, str]): Formatted command names, shared with the commands.
+    """
+    data = [(_code(md, codes, n), " &rarr; ".join([_code(md, codes, w) for w in stp])) for n, stp in wfs.items()]
+    if data:
+        sections.extend((strings["workflows_heading"],
+                         strings["workflows_intro"],
+                         md.table(data, strings["workflows_header"])))
+
+
+def _emit_assets(sections: List[str],
+                 md: MarkdownRenderer,
+                 strings: Dict[str, Any],
+                 assets: List[Dict[str, Any]],
+                 project_dir: Path) -> None:
+    """Add the assets table, if there are any assets.
+    sections (List[str]): The document sections, extended in place.
+    md (MarkdownRenderer): The renderer.
+    strings (Dict[str, Any]): The strings of the output language.
+    assets (List[Dict[str, Any]]): The project assets.
+    project_dir (Path): The project directory, to check for local assets.
+    """
+    def asset_row(asset: Dict[str, Any]) -> Tuple[str, str, str]:
+        source = "Git" if asset.get("git") else "URL" if asset.get("url") else "Local"
+        dest_path = asset["dest"]
+        dest = md.code(dest_path)
+        # Only link assets if they're in the repo
+        if source == "Local" and (project_dir / dest_path).exists():
+            dest = md.link(dest, dest_path)
+        return (dest, source, asset.get("description", ""))
+
+    data = [asset_row(a) for a in assets]
+    if data:
+        sections.extend((strings["assets_heading"],
+                         strings["assets_intro"],
+                         md.table(data, strings["assets_header"])))
+
+
+def _write_or_print(output_file: Path, sections: List[str], is_stdout: bool) -> None:
+    """Print the generated docs, or write them to a file. If the file exists,
+    only the part between the auto-generated markers is replaced, and files
+    with the ignore marker are left alone. Sections are written one by one,
+    so the full document is never built as one string.
+    output_file (Path): The file to write to.
+    sections (List[str]): The generated Markdown sections, in order.
+    is_stdout (bool): Whether to print to stdout instead.
+    """
+    if is_stdout:
+        _write_sections(sys.stdout, sections)
+        sys.stdout.write("\n")
+        return
+    try:
+        existing: Optional[str] = output_file.read_text(encoding="utf8")
+    except FileNotFoundError:
+        existing = None
+    start = end = -1
+    # Files that are skipped or already up to date are only read, so they may
+    # be read-only
+    if existing is not None:
+        if existing.find(MARKER_IGNORE) != -1:
+            msg.warn("Found ignore marker in existing file: skipping", output_file)
+            return
+        start = existing.find(MARKER_START)
+        end = existing.find(MARKER_END) if start != -1 else -1
+        if end != -1 and _sections_match(existing, sections, start, end + _LEN_END):
+            msg.info("Documentation is up to date", output_file)
+            return
+    with output_file.open("w", encoding="utf8") as f:
+        if existing is None:
+            _write_sections(f, sections)
+        elif end != -1:
+            msg.info("Found existing file: only replacing auto-generated docs")
+            f.write(existing[:start])
+            _write_sections(f, sections)
+            f.write(existing[end + _LEN_END:])
         else:
-            content = md.text
-            if output_file.exists():
-                with output_file.open("r", encoding="utf8") as f:
-                    existing = f.read()
-                if MARKER_IGNORE in existing:
-                    msg.warn("Found ignore marker in existing file: skipping", output_file)
-                    return
-                if MARKER_START in existing and MARKER_END in existing:
-                    msg.info("Found existing file: only replacing auto-generated docs")
-                    before = existing.split(MARKER_START)[0]
-                    after = existing.split(MARKER_END)[1]
-                    content = f"{before}{content}{after}"
-                else:
-                    msg.warn("Replacing existing file")
-            with output_file.open("w", encoding="utf8") as f:
-                f.write(content)
-            msg.good("Saved project documentation", output_file)
\ No newline at end of file
+            msg.warn("Replacing existing file")
+            _write_sections(f, sections)
+    msg.good("Saved project documentation", output_file)
+
+
+def _sections_match(text: str, sections: List[str], start: int, end: int) -> bool:
+    """Check whether a part of a text is exactly the given Markdown sections,
+    joined the way _write_sections writes them, without building the joined
+    string.
+    text (str): The text to check.
+    sections (List[str]): The Markdown sections.
+    start (int): Start index of the part to check.
+    end (int): End index of the part to check.
+    RETURNS (bool): Whether text[start:end] equals the joined sections.
+    """
+    pos = start
+    for i, section in enumerate(sections):
+        if i:
+            if not text.startswith("\n\n", pos, end):
+                return False
+            pos += 2
+        if not text.startswith(section, pos, end):
+            return False
+        pos += len(section)
+    return pos == end
+
+
+def _write_sections(f: IO[str], sections: List[str]) -> None:
+    """Write Markdown sections separated by blank lines, the same way
+    MarkdownRenderer.text joins them.
+    f (IO[str]): The file to write to.
+    sections (List[str]): The Markdown sections.
+    """
+    for i, section in enumerate(sections):
+        if i:
+            f.write("\n\n")
+        f.write(section)